@@ -1,7 +1,9 @@
 import pandas as pd
 import numpy as np
-from datetime import date, datetime, time as dt_time
+from datetime import date, datetime
 import os
+import csv
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 # ==============================================================================
 # UPDATED FOR TEST CASE #1
@@ -17,9 +19,39 @@ PROXY_DATE = date(2025, 1, 14)
 # --- Strategy Constants ---
 PROFIT_TARGET_PCT = 0.40  # Target 40% of max profit
 STOP_LOSS_PCT = 0.80      # Exit if loss exceeds 80% of max profit
+ENTRY_MINUTE = 9 * 60 + 45      # 09:45, as minutes since midnight
+EOD_EXIT_MINUTE = 15 * 60 + 10  # 15:10
+
+# Option legs in position order, and the sign that turns (entry - current)
+# price into P&L for each: +1 for sold legs, -1 for bought legs.
+LEG_COLUMNS = ['sell_ce_ltp', 'buy_ce_ltp', 'sell_pe_ltp', 'buy_pe_ltp']
+LEG_SIGNS = np.array([1.0, -1.0, 1.0, -1.0])
+
+# Outcome codes returned by backtest_core
+OUTCOME_NO_ENTRY = 0       # No bar at or after ENTRY_MINUTE
+OUTCOME_REJECTED = 1       # Net credit at entry was not positive
+OUTCOME_OPEN = 2           # Entered, but no exit condition was met
+OUTCOME_PROFIT_TARGET = 3
+OUTCOME_STOP_LOSS = 4
+OUTCOME_END_OF_DAY = 5
 
 # --- Part 2: Mock Data Feed Preparation ---
 
+def read_open_close(filename):
+    """
+    Returns the OPEN and CLOSE of the first data row of an OHLC CSV. Only the
+    header and one row are read, so no DataFrame is built for the file.
+    """
+    with open(filename, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        first_row = next(reader, None)
+
+    if header is None or first_row is None:
+        raise ValueError(f"Data file is empty: {filename}")
+
+    return float(first_row[header.index('OPEN')]), float(first_row[header.index('CLOSE')])
+
 def prepare_mock_data_feed():
     """
     Reads downloaded CSVs from the 'test_case_1' directory and creates a 
@@ -44,29 +76,31 @@ def prepare_mock_data_feed():
             "buy_pe": os.path.join(test_case_dir, "buy_pe_data.csv"),
         }
 
-        for name, filename in leg_files.items():
+        for filename in leg_files.values():
             if not os.path.exists(filename):
                 raise FileNotFoundError(f"Required data file not found: {filename}")
-            
-            df = pd.read_csv(filename)
-            if df.empty:
-                raise ValueError(f"Data file is empty: {filename}")
-            
-            options_ohlc[f"{name}_open"] = df['OPEN'].iloc[0]
-            options_ohlc[f"{name}_close"] = df['CLOSE'].iloc[0]
+
+        # The four reads are independent and I/O-bound, so overlap them
+        with ThreadPoolExecutor(max_workers=len(leg_files)) as executor:
+            leg_prices = dict(zip(leg_files, executor.map(read_open_close, leg_files.values())))
+
+        for name, filename in leg_files.items():
+            options_ohlc[f"{name}_open"], options_ohlc[f"{name}_close"] = leg_prices[name]
             print(f"Read {filename}: OPEN={options_ohlc[f'{name}_open']}, CLOSE={options_ohlc[f'{name}_close']}")
 
         # 3. Create Synthetic Intraday Feed (9:15 to 15:30 -> 376 minutes)
         trading_minutes = 376
-        timestamps = pd.to_datetime(pd.date_range(f"{PROXY_DATE} 09:15", f"{PROXY_DATE} 15:30", freq="min"))
+        session_start = np.datetime64(f"{PROXY_DATE}T09:15", "ns")
+        timestamps = session_start + np.arange(trading_minutes) * np.timedelta64(1, "m")
         
-        mock_feed = pd.DataFrame(index=timestamps)
-        mock_feed['spot_price'] = np.linspace(spot_open, spot_close, trading_minutes)
-        
-        for name, filepath in leg_files.items():
-            open_price = options_ohlc[f"{name}_open"]
-            close_price = options_ohlc[f"{name}_close"]
-            mock_feed[f"{name}_ltp"] = np.linspace(open_price, close_price, trading_minutes)
+        # Interpolate spot and all four legs in one broadcast over a shared
+        # 0..1 ramp, producing the (minutes x 5) feed in a single array.
+        columns = ['spot_price'] + [f"{name}_ltp" for name in leg_files]
+        opens = np.array([spot_open] + [options_ohlc[f"{name}_open"] for name in leg_files], dtype=float)
+        closes = np.array([spot_close] + [options_ohlc[f"{name}_close"] for name in leg_files], dtype=float)
+        ramp = np.linspace(0.0, 1.0, trading_minutes)[:, None]
+
+        mock_feed = pd.DataFrame(opens + ramp * (closes - opens), index=timestamps, columns=columns)
 
         print("Mock data feed prepared successfully from real historical data.")
         return mock_feed
@@ -77,89 +111,141 @@ def prepare_mock_data_feed():
 
 # --- Part 3: Backtesting Logic (Unchanged) ---
 
-def log_trade(log_df, timestamp, event, details):
+trade_log_cols = ["timestamp", "event", "details"]
+
+def log_trade(trade_log, timestamp, event, details):
     """Appends a trade event to the log."""
     print(f"{timestamp} | {event}: {details}")
-    new_log = pd.DataFrame([{"timestamp": timestamp, "event": event, "details": details}])
-    # Use pd.concat instead of the deprecated append method
-    return pd.concat([log_df, new_log], ignore_index=True)
+    trade_log.append({"timestamp": timestamp, "event": event, "details": details})
+
+def minutes_of_day(index):
+    """Returns the minute-of-day integers for a DatetimeIndex (09:45 -> 585)."""
+    return (index.hour * 60 + index.minute).to_numpy()
+
+def backtest_core(leg_prices, minutes, entry_minute, eod_minute, profit_target_pct, stop_loss_pct):
+    """
+    Pure array kernel of the strategy, kept free of pandas and logging so that
+    parameter sweeps can call it directly on a pre-extracted (bars x legs)
+    price matrix ordered like LEG_COLUMNS and the bars' minutes of day.
+
+    Returns (entry_idx, exit_idx, net_credit, exit_pnl, outcome), where outcome
+    is one of the OUTCOME_* codes and indices are -1 when not applicable.
+    """
+    # The feed is sorted by time, so the first bar at or after the entry time
+    # can be located with a binary search.
+    entry = int(np.searchsorted(minutes, entry_minute))
+    if entry >= len(minutes):
+        return -1, -1, 0.0, 0.0, OUTCOME_NO_ENTRY
+
+    entry_prices = leg_prices[entry]
+    net_credit = float(LEG_SIGNS @ entry_prices)
+    if net_credit <= 0:
+        return entry, -1, net_credit, 0.0, OUTCOME_REJECTED
+
+    profit_target = net_credit * profit_target_pct
+    stop_loss = net_credit * stop_loss_pct
+
+    # Mark-to-Market P&L for every bar from entry onwards
+    pnl = (entry_prices - leg_prices[entry:]) @ LEG_SIGNS
+
+    exit_mask = (pnl >= profit_target) | (pnl <= -stop_loss) | (minutes[entry:] >= eod_minute)
+    if not exit_mask.any():
+        return entry, -1, net_credit, pnl[-1], OUTCOME_OPEN
+
+    offset = int(np.argmax(exit_mask))
+    exit_pnl = pnl[offset]
+    if exit_pnl >= profit_target:
+        outcome = OUTCOME_PROFIT_TARGET
+    elif exit_pnl <= -stop_loss:
+        outcome = OUTCOME_STOP_LOSS
+    else:
+        outcome = OUTCOME_END_OF_DAY
+    return entry, entry + offset, net_credit, exit_pnl, outcome
 
 def run_backtest(mock_data_feed):
     """
-    Iterates through the mock data feed and applies the trading strategy.
+    Applies the trading strategy to the mock data feed and logs the resulting
+    entry and exit events.
     """
     if mock_data_feed is None:
         print("Backtest cannot run because mock data feed failed to generate.")
         return pd.DataFrame()
 
     print("\n--- Running Backtest ---")
-    trade_log = pd.DataFrame({
-        "timestamp": pd.Series(dtype='datetime64[ns]'),
-        "event": pd.Series(dtype='object'),
-        "details": pd.Series(dtype='object')
-    })
-    
-    trade_active = False
-    position_book = {}
-    net_credit = 0.0
-    pnl = 0.0
-    profit_target = 0.0
-    stop_loss = 0.0
-    entry_time = dt_time(9, 45) # Corrected time object usage
-
-    for timestamp, row in mock_data_feed.iterrows():
-        current_time = timestamp.time()
-        
-        if not trade_active and current_time >= entry_time:
-            trade_active = True
-            
-            position_book = {
-                "sell_ce": row['sell_ce_ltp'], "buy_ce": row['buy_ce_ltp'],
-                "sell_pe": row['sell_pe_ltp'], "buy_pe": row['buy_pe_ltp'],
-            }
-            
-            net_credit = (position_book['sell_ce'] - position_book['buy_ce']) + \
-                         (position_book['sell_pe'] - position_book['buy_pe'])
-            
-            # Ensure net credit is positive before proceeding
-            if net_credit <= 0:
-                trade_log = log_trade(trade_log, timestamp, "TRADE REJECTED", f"Negative Net Credit: {net_credit:.2f}")
-                break
+    trade_log = []
 
-            details = f"Net Credit: {net_credit:.2f} | Positions: {position_book}"
-            trade_log = log_trade(trade_log, timestamp, "ENTRY", details)
-            
-            profit_target = net_credit * PROFIT_TARGET_PCT
-            stop_loss = net_credit * STOP_LOSS_PCT
-            trade_log = log_trade(trade_log, timestamp, "TARGETS", f"Profit Target: {profit_target:.2f}, Stop-Loss: {stop_loss:.2f}")
-
-        if trade_active:
-            # Mark-to-Market P&L calculation
-            mtm_sell_ce = position_book['sell_ce'] - row['sell_ce_ltp']
-            mtm_buy_ce = row['buy_ce_ltp'] - position_book['buy_ce']
-            mtm_sell_pe = position_book['sell_pe'] - row['sell_pe_ltp']
-            mtm_buy_pe = row['buy_pe_ltp'] - position_book['buy_pe']
-            
-            pnl = (mtm_sell_ce + mtm_buy_ce + mtm_sell_pe + mtm_buy_pe)
-            
-            exit_reason = None
-            if pnl >= profit_target:
-                exit_reason = f"Profit Target Hit ({pnl:.2f} >= {profit_target:.2f})"
-            elif pnl <= -stop_loss:
-                exit_reason = f"Stop-Loss Hit ({pnl:.2f} <= {-stop_loss:.2f})"
-            elif current_time >= dt_time(15, 10): # Corrected time object usage
+    timestamps = mock_data_feed.index
+    leg_prices = mock_data_feed[LEG_COLUMNS].to_numpy()
+
+    entry, exit_idx, net_credit, exit_pnl, outcome = backtest_core(
+        leg_prices, minutes_of_day(timestamps), ENTRY_MINUTE, EOD_EXIT_MINUTE,
+        PROFIT_TARGET_PCT, STOP_LOSS_PCT
+    )
+
+    # Ensure net credit is positive before proceeding
+    if outcome == OUTCOME_REJECTED:
+        log_trade(trade_log, timestamps[entry], "TRADE REJECTED", f"Negative Net Credit: {net_credit:.2f}")
+    elif outcome != OUTCOME_NO_ENTRY:
+        entry_ts = timestamps[entry]
+        position_book = {
+            col.removesuffix('_ltp'): price for col, price in zip(LEG_COLUMNS, leg_prices[entry])
+        }
+        details = f"Net Credit: {net_credit:.2f} | Positions: {position_book}"
+        log_trade(trade_log, entry_ts, "ENTRY", details)
+
+        profit_target = net_credit * PROFIT_TARGET_PCT
+        stop_loss = net_credit * STOP_LOSS_PCT
+        log_trade(trade_log, entry_ts, "TARGETS", f"Profit Target: {profit_target:.2f}, Stop-Loss: {stop_loss:.2f}")
+
+        if outcome != OUTCOME_OPEN:
+            if outcome == OUTCOME_PROFIT_TARGET:
+                exit_reason = f"Profit Target Hit ({exit_pnl:.2f} >= {profit_target:.2f})"
+            elif outcome == OUTCOME_STOP_LOSS:
+                exit_reason = f"Stop-Loss Hit ({exit_pnl:.2f} <= {-stop_loss:.2f})"
+            else:
                 exit_reason = "End of Day Exit"
 
-            if exit_reason:
-                details = f"Exit Reason: {exit_reason} | Final P&L: {pnl:.2f}"
-                trade_log = log_trade(trade_log, timestamp, "EXIT", details)
-                break
+            details = f"Exit Reason: {exit_reason} | Final P&L: {exit_pnl:.2f}"
+            log_trade(trade_log, timestamps[exit_idx], "EXIT", details)
     
-    if not any(trade_log['event'] == 'ENTRY'):
-        trade_log = log_trade(trade_log, datetime.now(), "NO TRADE", "Entry conditions were not met.")
+    if not any(row['event'] == 'ENTRY' for row in trade_log):
+        log_trade(trade_log, datetime.now(), "NO TRADE", "Entry conditions were not met.")
         
     print("--- Backtest Finished ---")
-    return trade_log
+    return pd.DataFrame(trade_log, columns=trade_log_cols)
+
+def run_sweep_point(leg_prices, minutes, profit_target_pct, stop_loss_pct):
+    """Runs a single parameter combination; used as the process pool task."""
+    _, _, _, exit_pnl, outcome = backtest_core(
+        leg_prices, minutes, ENTRY_MINUTE, EOD_EXIT_MINUTE, profit_target_pct, stop_loss_pct
+    )
+    return outcome, exit_pnl
+
+def run_parameter_sweep(mock_data_feed, profit_target_pcts, stop_loss_pcts, max_workers=None):
+    """
+    Runs the strategy for every (profit target, stop-loss) combination across a
+    process pool and returns a DataFrame with one row per combination.
+    """
+    leg_prices = mock_data_feed[LEG_COLUMNS].to_numpy()
+    minutes = minutes_of_day(mock_data_feed.index)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        futures = {
+            executor.submit(run_sweep_point, leg_prices, minutes, profit_pct, stop_pct): (profit_pct, stop_pct)
+            for profit_pct in profit_target_pcts
+            for stop_pct in stop_loss_pcts
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            profit_pct, stop_pct = futures[future]
+            outcome, pnl = future.result()
+            results.append({
+                "profit_target_pct": profit_pct, "stop_loss_pct": stop_pct,
+                "outcome": outcome, "pnl": pnl
+            })
+            print(f"Sweep progress: {done}/{len(futures)}")
+
+    return pd.DataFrame(results).sort_values(["profit_target_pct", "stop_loss_pct"], ignore_index=True)
 
 # --- Part 4: Main Execution Block ---
 
@@ -197,6 +283,3 @@ if __name__ == "__main__":
                 print("\n--- Backtest Summary ---")
                 print("No trade was executed or completed.")
                 print("------------------------")
-
-
-{final_log.to_csv(index=False)}
\ No newline at end of file
@@ -1,5 +1,6 @@
 
 import pandas as pd
+import numpy as np
 from jugaad_data import set_cache_location
 from jugaad_data.nse import index_df
 from datetime import date, timedelta
@@ -35,28 +36,27 @@ def find_proxy_date():
         nifty_data['LOW'] = pd.to_numeric(nifty_data['LOW'])
         nifty_data['CLOSE'] = pd.to_numeric(nifty_data['CLOSE'])
 
-        # Scan for the pattern from newest to oldest
-        for i in range(len(nifty_data) - 1, 0, -1):
-            t_minus_1 = nifty_data.iloc[i-1]
-            t_day = nifty_data.iloc[i]
+        # Evaluate the pattern for every day at once against the previous day
+        t_minus_1 = nifty_data.shift(1)
 
-            # Criteria for Day T-1 (Breakout)
-            is_breakout = (
-                ((t_minus_1['CLOSE'] - t_minus_1['OPEN']) / t_minus_1['OPEN']) * 100 > 0.5 and
-                (t_minus_1['CLOSE'] > t_minus_1['HIGH'] * 0.995) # Close is within 0.5% of the high
-            )
+        # Criteria for Day T-1 (Breakout)
+        is_breakout = (
+            (((t_minus_1['CLOSE'] - t_minus_1['OPEN']) / t_minus_1['OPEN']) * 100 > 0.5) &
+            (t_minus_1['CLOSE'] > t_minus_1['HIGH'] * 0.995) # Close is within 0.5% of the high
+        )
 
-            if is_breakout:
-                # Criteria for Day T (Inside Day)
-                is_inside_day = (
-                    t_day['HIGH'] < t_minus_1['HIGH'] and
-                    t_day['LOW'] > t_minus_1['LOW']
-                )
+        # Criteria for Day T (Inside Day)
+        is_inside_day = (
+            (nifty_data['HIGH'] < t_minus_1['HIGH']) &
+            (nifty_data['LOW'] > t_minus_1['LOW'])
+        )
 
-                if is_inside_day:
-                    proxy_date = t_day.name.date()
-                    print(f"Proxy Date Found: {proxy_date}")
-                    return
+        # The data is sorted ascending, so the last hit is the newest matching day
+        hits = np.flatnonzero((is_breakout & is_inside_day).to_numpy())
+        if hits.size:
+            proxy_date = nifty_data.index[hits[-1]].date()
+            print(f"Proxy Date Found: {proxy_date}")
+            return
 
     except Exception as e:
         print(f"An error occurred: {e}")
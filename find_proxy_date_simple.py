@@ -1,5 +1,6 @@
 
 import pandas as pd
+import numpy as np
 from jugaad_data.nse import index_df
 from datetime import date, timedelta
 import sys
@@ -22,26 +23,24 @@ def find_proxy_date_simple():
         nifty_data['LOW'] = pd.to_numeric(nifty_data['LOW'])
         nifty_data['CLOSE'] = pd.to_numeric(nifty_data['CLOSE'])
 
-        # Scan for the pattern from newest to oldest
-        for i in range(len(nifty_data) - 1, 0, -1):
-            t_minus_1 = nifty_data.iloc[i-1]
-            t_day = nifty_data.iloc[i]
-
-            is_breakout = (
-                ((t_minus_1['CLOSE'] - t_minus_1['OPEN']) / t_minus_1['OPEN']) * 100 > 0.5 and
-                (t_minus_1['CLOSE'] > t_minus_1['HIGH'] * 0.995)
-            )
-
-            if is_breakout:
-                is_inside_day = (
-                    t_day['HIGH'] < t_minus_1['HIGH'] and
-                    t_day['LOW'] > t_minus_1['LOW']
-                )
-
-                if is_inside_day:
-                    proxy_date = t_day.name.date()
-                    print(f"SUCCESS: Proxy Date Found: {proxy_date}")
-                    return
+        # Evaluate the pattern for every day at once against the previous day
+        t_minus_1 = nifty_data.shift(1)
+
+        is_breakout = (
+            (((t_minus_1['CLOSE'] - t_minus_1['OPEN']) / t_minus_1['OPEN']) * 100 > 0.5) &
+            (t_minus_1['CLOSE'] > t_minus_1['HIGH'] * 0.995)
+        )
+
+        is_inside_day = (
+            (nifty_data['HIGH'] < t_minus_1['HIGH']) &
+            (nifty_data['LOW'] > t_minus_1['LOW'])
+        )
+
+        hits = np.flatnonzero((is_breakout & is_inside_day).to_numpy())
+        if hits.size:
+            proxy_date = nifty_data.index[hits[-1]].date()
+            print(f"SUCCESS: Proxy Date Found: {proxy_date}")
+            return
 
         print("INFO: No date matching the criteria was found in the last year.")
 
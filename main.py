@@ -1,19 +1,53 @@
-import time
 import pandas as pd
 from datetime import datetime, time as dt_time
 from jugaad_data.nse import NSELive
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
 import os
+import queue
+import logging
+from dataclasses import dataclass
+from types import SimpleNamespace
 from dotenv import load_dotenv
 from flask import Flask, jsonify
 from threading import Thread
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from apscheduler.schedulers.background import BackgroundScheduler
 from pytz import timezone
 
 # --- Load Environment Variables ---
 load_dotenv()
 
+# --- Logging ---
+# Errors go through a rate-limited logger so a long API outage prints one
+# traceback per LOG_RATE_LIMIT_SECONDS instead of one per poll.
+LOG_RATE_LIMIT_SECONDS = 60
+
+class RateLimitFilter(logging.Filter):
+    """Pass at most one record per `rate_key` every `interval` seconds."""
+    def __init__(self, interval: float):
+        super().__init__()
+        self.interval = interval
+        self.last_emitted = {}
+
+    def filter(self, record):
+        key = getattr(record, 'rate_key', None)
+        if key is None:
+            return True
+        last = self.last_emitted.get(key)
+        if last is not None and record.created - last < self.interval:
+            return False
+        self.last_emitted[key] = record.created
+        return True
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+logger = logging.getLogger(__name__)
+# APScheduler logs every job run at INFO; at the polling rate that drowns the bot's own output
+logging.getLogger('apscheduler').setLevel(logging.WARNING)
+logger.addFilter(RateLimitFilter(LOG_RATE_LIMIT_SECONDS))
+
 # --- Flask App Initialization ---
 app = Flask(__name__)
 
@@ -25,6 +59,17 @@ bot_state = {
     "status_message": "Initializing..."
 }
 
+def publish_state_snapshot():
+    """
+    Publish an immutable copy of bot_state for the status page. The trading
+    job rebinds the snapshot in one step, so readers never see a half-updated
+    dict.
+    """
+    global bot_state_snapshot
+    bot_state_snapshot = SimpleNamespace(**{**bot_state, 'position_book': dict(bot_state['position_book'])})
+
+publish_state_snapshot()
+
 # --- Application & State Configuration ---
 STATE_FILE = 'trade_state.json'
 POLLING_INTERVAL_SECONDS = int(os.getenv('POLLING_INTERVAL_SECONDS', 8))
@@ -33,64 +78,358 @@ MARKET_CLOSE_TIME = dt_time.fromisoformat(os.getenv('MARKET_CLOSE_TIME', '15:30:
 LOG_FILE_NAME = os.getenv('LOG_FILE_NAME', 'paper_trade_log.csv')
 INDIA_TZ = timezone('Asia/Kolkata')
 
+# Adaptive polling: slow down well before entry, speed up around decision
+# points, and back off exponentially while the API keeps failing.
+PRE_ENTRY_POLL_SECONDS = int(os.getenv('PRE_ENTRY_POLL_SECONDS', 30))
+FAST_POLL_SECONDS = int(os.getenv('FAST_POLL_SECONDS', 3))
+FAST_POLL_WINDOW_SECONDS = 60
+MAX_BACKOFF_SECONDS = POLLING_INTERVAL_SECONDS * 4
+
 # --- Telegram Configuration ---
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+# Built once; None disables notifications when credentials are missing
+TELEGRAM_URL = (
+    f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID else None
+)
+TELEGRAM_BASE_PAYLOAD = {'chat_id': TELEGRAM_CHAT_ID, 'parse_mode': 'Markdown'}
+if TELEGRAM_URL is None:
+    print("Telegram credentials not found. Notifications are disabled.")
 
 # --- Strategy Parameters ---
-PRIMARY_STRATEGY = os.getenv('PRIMARY_STRATEGY', 'IronCondor')
-LOT_SIZE = int(os.getenv('LOT_SIZE', 50))
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Strategy parameters, parsed from the environment once at import."""
+    primary_strategy: str
+    lot_size: float
+    min_spot: float
+    max_spot: float
+    sl_min: float
+    sl_max: float
+    profit_target: float
+
+CFG = Config(
+    primary_strategy=os.getenv('PRIMARY_STRATEGY', 'IronCondor'),
+    lot_size=float(os.getenv('LOT_SIZE', 50)),
+    min_spot=float(os.getenv('MIN_SPOT', 0)),
+    max_spot=float(os.getenv('MAX_SPOT', 0)),
+    sl_min=float(os.getenv('STOP_LOSS_MIN', 0)),
+    sl_max=float(os.getenv('STOP_LOSS_MAX', 0)),
+    profit_target=float(os.getenv('PROFIT_TARGET_PER_LOT', 0)),
+)
 INSTRUMENTS = {
     'SELL_CE_STRIKE': int(os.getenv('SELL_CE_STRIKE', 0)),
     'BUY_CE_STRIKE': int(os.getenv('BUY_CE_STRIKE', 0)),
     'SELL_PE_STRIKE': int(os.getenv('SELL_PE_STRIKE', 0)),
     'BUY_PE_STRIKE': int(os.getenv('BUY_PE_STRIKE', 0)),
 }
-ENTRY_CONDITIONS = {
-    'MIN_SPOT': float(os.getenv('MIN_SPOT', 0)),
-    'MAX_SPOT': float(os.getenv('MAX_SPOT', 0)),
-}
 ENTRY_TIME_START = dt_time.fromisoformat(os.getenv('ENTRY_TIME_START', '09:30:00'))
-STOP_LOSS_RANGE = {
-    'MIN': float(os.getenv('STOP_LOSS_MIN', 0)),
-    'MAX': float(os.getenv('STOP_LOSS_MAX', 0)),
-}
-PROFIT_TARGET_PER_LOT = float(os.getenv('PROFIT_TARGET_PER_LOT', 0))
 
-# --- Global DataFrame for Logging ---
+# Session boundaries as seconds since midnight, for cheap integer compares in the loop
+def seconds_of_day(t: dt_time) -> int:
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+MARKET_OPEN_SECONDS = seconds_of_day(MARKET_OPEN_TIME)
+MARKET_CLOSE_SECONDS = seconds_of_day(MARKET_CLOSE_TIME)
+ENTRY_TIME_START_SECONDS = seconds_of_day(ENTRY_TIME_START)
+
+# Position book legs; each leg's LTP lives in live_data[f"{leg.lower()}_ltp"]
+POSITION_LEGS = ('SELL_CE', 'BUY_CE', 'SELL_PE', 'BUY_PE')
+
+# (live_data field, INSTRUMENTS key, option type) for each leg of the position
+OPTION_LEGS = (
+    ('sell_ce_ltp', 'SELL_CE_STRIKE', 'CE'),
+    ('buy_ce_ltp', 'BUY_CE_STRIKE', 'CE'),
+    ('sell_pe_ltp', 'SELL_PE_STRIKE', 'PE'),
+    ('buy_pe_ltp', 'BUY_PE_STRIKE', 'PE'),
+)
+# (strike, option type) -> live_data fields priced from that chain entry,
+# so the option chain can be swept once for all legs
+OPTION_LEG_FIELDS = {}
+for field, strike_key, option_type in OPTION_LEGS:
+    OPTION_LEG_FIELDS.setdefault((INSTRUMENTS[strike_key], option_type), []).append(field)
+# Strikes we trade, for a single membership test per option chain record
+STRIKES_OF_INTEREST = frozenset(strike for strike, _ in OPTION_LEG_FIELDS)
+
+# Last payload written by save_state, used to skip rewriting identical state
+last_saved_state = None
+
+# --- Telegram Message Templates ---
+# Filled with str.format_map at send time
+DEPLOYMENT_MSG_TMPL = (
+    "✅ *Deployment Successful & Bot Initialized*\n"
+    "Strategy: {strategy}\n"
+    "Watching NIFTY 50."
+)
+MORNING_MSG_TMPL = (
+    "☀️ *Good Morning!* (IST: {time})\n"
+    "Bot Status: `{status}`\n"
+    "Awaiting market open and entry conditions."
+)
+ENTRY_MSG_TMPL = (
+    "🚀 *--- TRADE ENTERED ---*\n"
+    "Strategy: {strategy}\n"
+    "Spot Price: *{spot:.2f}*\n"
+    "SELL CE {sell_ce_strike}: {sell_ce_ltp}\n"
+    "BUY CE {buy_ce_strike}: {buy_ce_ltp}\n"
+    "SELL PE {sell_pe_strike}: {sell_pe_ltp}\n"
+    "BUY PE {buy_pe_strike}: {buy_pe_ltp}"
+)
+EXIT_MSG_TMPL = (
+    "🛑 *--- TRADE EXITED ---*\n"
+    "Reason: {reason}\n"
+    "Final P&L: *₹{pnl:.2f}*"
+)
+MARKET_CLOSED_EXIT_MSG_TMPL = (
+    "🛑 *--- TRADE EXITED (Market Closed) ---*\n"
+    "Final P&L: *₹{pnl:.2f}*"
+)
+# Strikes never change while the process runs, so merge them in once
+ENTRY_MSG_STRIKES = {key.lower(): strike for key, strike in INSTRUMENTS.items()}
+
+# --- HTTP Connection Reuse ---
+# A persistent session keeps the TLS connection to Telegram alive between
+# messages instead of paying a fresh handshake on every send.
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 8
+
+def pooled_adapter(connect_retries_only: bool = False):
+    """
+    HTTPAdapter with a keep-alive connection pool and a small retry budget.
+    With connect_retries_only, read timeouts and error statuses are not
+    retried; NSE fetches use this because fetch_live_data stops waiting after
+    NSE_FETCH_TIMEOUT_SECONDS, so a retried read would only tie up a worker.
+    """
+    if connect_retries_only:
+        retry = Retry(total=2, read=0, status=0, backoff_factor=0.3)
+    else:
+        retry = Retry(total=2, backoff_factor=0.3)
+    return HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+
+http_session = requests.Session()
+http_session.headers.update({'Connection': 'keep-alive'})
+http_session.mount('https://', pooled_adapter())
+
+# --- NSE Fetch Pool ---
+# The index quote and the option chain are independent requests; issuing them
+# on two workers overlaps their round-trips instead of paying them back to back.
+NSE_FETCH_TIMEOUT_SECONDS = 10
+nse_pool = ThreadPoolExecutor(max_workers=2)
+
+# --- Global Trade Log (materialized into a DataFrame on shutdown) ---
 trade_log_cols = ['timestamp', 'action', 'instrument', 'price', 'pnl', 'commentary']
-trade_log = pd.DataFrame({
-    'timestamp': pd.Series(dtype='datetime64[ns]'), 
-    'action': pd.Series(dtype='object'),
-    'instrument': pd.Series(dtype='object'), 
-    'price': pd.Series(dtype='float64'),
-    'pnl': pd.Series(dtype='float64'), 
-    'commentary': pd.Series(dtype='object')
-})
+trade_log_rows: list[tuple] = []
 
 # --- Core Functions ---
+# --- Telegram Delivery ---
+# Messages are queued and posted by a daemon worker, so a slow Telegram round
+# trip never holds up the trading tick. Messages arriving within
+# TELEGRAM_BATCH_WAIT_SECONDS of each other are sent as one API call.
+TELEGRAM_BATCH_WAIT_SECONDS = 0.5
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+telegram_queue = queue.SimpleQueue()
+
 def send_telegram_message(message):
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
-        print("Telegram credentials not found. Skipping notification.")
+    if TELEGRAM_URL is None:
         return
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {'chat_id': TELEGRAM_CHAT_ID, 'text': message, 'parse_mode': 'Markdown'}
+    telegram_queue.put(message)
+
+def post_telegram_message(message) -> bool:
+    """Post one message; returns True if Telegram accepted it."""
     try:
-        response = requests.post(url, json=payload, timeout=10)
+        response = http_session.post(TELEGRAM_URL, json={**TELEGRAM_BASE_PAYLOAD, 'text': message}, timeout=10)
         if response.status_code != 200:
             print(f"Error sending Telegram message: {response.status_code} - {response.text}")
+            return False
+        return True
     except requests.exceptions.RequestException as e:
         print(f"Exception while sending Telegram message: {e}")
+        return False
+
+def post_telegram_batch(messages):
+    """
+    Post queued messages as one Telegram message. If Telegram rejects the
+    batch (e.g. one message has unbalanced Markdown), resend them one by one
+    so a single bad message does not take the others down with it.
+    """
+    if len(messages) == 1:
+        post_telegram_message(messages[0])
+    elif not post_telegram_message("\n\n".join(messages)):
+        for message in messages:
+            post_telegram_message(message)
+
+def telegram_worker():
+    """Drain telegram_queue forever, batching messages that arrive close together."""
+    while True:
+        try:
+            batch = [telegram_queue.get()]
+            batch_length = len(batch[0])
+            while True:
+                try:
+                    message = telegram_queue.get(timeout=TELEGRAM_BATCH_WAIT_SECONDS)
+                except queue.Empty:
+                    break
+                # Keep each post under Telegram's message size limit
+                if batch_length + 2 + len(message) > TELEGRAM_MAX_MESSAGE_LENGTH:
+                    post_telegram_batch(batch)
+                    batch, batch_length = [], -2
+                batch.append(message)
+                batch_length += 2 + len(message)
+            post_telegram_batch(batch)
+        except Exception as e:
+            # Never let one bad send stop delivery for the rest of the process
+            logger.error("Telegram worker error: %s", e, exc_info=True)
+
+if TELEGRAM_URL is not None:
+    Thread(target=telegram_worker, daemon=True).start()
+
+def save_state(state):
+    """
+    Persist trade state atomically: write to a temp file, fsync it and rename
+    it over STATE_FILE, so a crash mid-write never leaves a truncated state
+    file. Writes are skipped when the payload matches what is already on disk.
+    """
+    global last_saved_state
+    data = orjson.dumps(state)
+    if data == last_saved_state:
+        return
+    tmp_file = STATE_FILE + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, STATE_FILE)
+    last_saved_state = data
+
+def clear_state_file():
+    """Remove the persisted trade state and forget the last saved payload."""
+    global last_saved_state
+    last_saved_state = None
+    try:
+        os.remove(STATE_FILE)
+    except FileNotFoundError:
+        pass
 
 def log_trade(timestamp, action, instrument, price, pnl, commentary):
-    global trade_log
-    new_log_entry = pd.DataFrame([[timestamp, action, instrument, price, pnl, commentary]], columns=trade_log_cols)
-    trade_log = pd.concat([trade_log, new_log_entry], ignore_index=True)
+    trade_log_rows.append((timestamp, action, instrument, price, pnl, commentary))
+
+class NSESession(requests.Session):
+    """
+    Session for NSE calls: pooled keep-alive connections, connect-only retries
+    and NSE_FETCH_TIMEOUT_SECONDS on every request that doesn't set its own,
+    so a hung call frees its nse_pool worker.
+    """
+    def __init__(self):
+        super().__init__()
+        self.mount('https://', pooled_adapter(connect_retries_only=True))
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', NSE_FETCH_TIMEOUT_SECONDS)
+        return super().request(method, url, **kwargs)
 
-def fetch_live_data(n: NSELive, instruments: dict) -> dict:
+class FastNSELive(NSELive):
+    """
+    NSELive that decodes API responses with orjson. The option chain payload is
+    large and parsed on every poll, so this is the dominant per-poll CPU cost.
+    """
+    @property
+    def s(self):
+        return self._session
+
+    @s.setter
+    def s(self, session):
+        # NSELive.__init__ assigns a bare Session and then primes cookies with
+        # an untimed page request on it. Swap in an NSESession so that request,
+        # and every poll after it, is timed out and uses the pooled adapter.
+        self._session = session if isinstance(session, NSESession) else NSESession()
+
+    def get(self, route, payload={}):
+        url = self.base_url + self._routes[route]
+        r = self.s.get(url, params=payload)
+        return orjson.loads(r.content)
+
+def fetch_spot(n: NSELive):
+    """Fetch the NIFTY 50 spot price, or None if the response has no usable value."""
+    # Fetch live index data - returns dict with 'name', 'timestamp', 'data' keys
+    index_response = n.live_index("NIFTY 50")
+    
+    # The response structure: {'name': 'NIFTY 50', 'timestamp': '...', 'data': [...]}
+    # Extract spot price from the first element in data array
+    if isinstance(index_response, dict) and 'data' in index_response:
+        if len(index_response['data']) > 0:
+            spot = index_response['data'][0].get('lastPrice')
+            print(f"Spot Price: {spot}")
+            return spot
+    else:
+        print("API WARNING: Unexpected format for live_index response.")
+        print(f"Response: {index_response}")
+    return None
+
+def fetch_option_ltps(n: NSELive) -> dict:
+    """
+    Fetch the option chain and return {live_data field: LTP} for each leg.
+    Legs whose LTP could not be found are left out of the result.
+    """
+    oc_data = n.index_option_chain("NIFTY")
+    
+    if not oc_data:
+        print("WARNING: Option chain data is empty")
+        return {}
+        
+    # The option chain structure: {'records': {'data': [...]}, ...}
+    records = oc_data.get('records', {})
+    data_list = records.get('data', [])
+    
+    if not data_list:
+        print("WARNING: No data in option chain")
+        return {}
+    
+    # Sweep the chain once, pricing every leg as its strike comes up. A strike
+    # can appear in several records (one per expiry, some with only one side),
+    # so a leg is done only once a record with a usable lastPrice has been
+    # read; the first such record wins and the sweep stops once all are priced.
+    ltps = {}
+    pending = len(OPTION_LEG_FIELDS)
+    seen = set()
+    for record in data_list:
+        strike = record.get('strikePrice')
+        if strike not in STRIKES_OF_INTEREST:
+            continue
+        for option_type in ('CE', 'PE'):
+            key = (strike, option_type)
+            fields = OPTION_LEG_FIELDS.get(key)
+            if fields is None or key in seen:
+                continue
+            option_data = record.get(option_type)
+            if not isinstance(option_data, dict) or option_data.get('lastPrice') is None:
+                continue
+            seen.add(key)
+            pending -= 1
+            ltp = float(option_data['lastPrice'])
+            for field in fields:
+                ltps[field] = ltp
+        if not pending:
+            break
+    
+    # Log which prices were found
+    print(f"Fetched prices - SELL_CE: {ltps.get('sell_ce_ltp')}, "
+          f"BUY_CE: {ltps.get('buy_ce_ltp')}, "
+          f"SELL_PE: {ltps.get('sell_pe_ltp')}, "
+          f"BUY_PE: {ltps.get('buy_pe_ltp')}")
+    return ltps
+
+def fetch_live_data(n: NSELive, timestamp: datetime, include_options: bool = True):
     """
     Fetch live data from NSE with proper data structure handling.
-    Returns a dictionary with spot price and option LTPs.
+    Returns a dictionary with spot price and option LTPs, stamped with the
+    caller's loop timestamp, or None if the fetch failed or a required value is
+    missing. With include_options=False only the cheap index quote is fetched
+    and the LTP fields stay None.
     """
     live_data = {
         'spot': None, 
@@ -98,83 +437,58 @@ def fetch_live_data(n: NSELive, instruments: dict) -> dict:
         'buy_ce_ltp': None, 
         'sell_pe_ltp': None, 
         'buy_pe_ltp': None, 
-        'timestamp': datetime.now()
+        'timestamp': timestamp
     }
     
+    # Start both requests before waiting on either
+    spot_future = nse_pool.submit(fetch_spot, n)
+    ltps_future = nse_pool.submit(fetch_option_ltps, n) if include_options else None
+
     try:
-        # Fetch live index data - returns dict with 'name', 'timestamp', 'data' keys
-        index_response = n.live_index("NIFTY 50")
-        
-        # The response structure: {'name': 'NIFTY 50', 'timestamp': '...', 'data': [...]}
-        # Extract spot price from the first element in data array
-        if isinstance(index_response, dict) and 'data' in index_response:
-            if len(index_response['data']) > 0:
-                live_data['spot'] = index_response['data'][0].get('lastPrice')
-                print(f"Spot Price: {live_data['spot']}")
-        else:
-            print("API WARNING: Unexpected format for live_index response.")
-            print(f"Response: {index_response}")
-
-        # Fetch option chain data
-        oc_data = n.index_option_chain("NIFTY")
-        
-        # Debug: Print structure to understand the format
-        if not oc_data:
-            print("WARNING: Option chain data is empty")
-            return live_data
-            
-        # The option chain structure: {'records': {'data': [...]}, ...}
-        records = oc_data.get('records', {})
-        data_list = records.get('data', [])
-        
-        if not data_list:
-            print("WARNING: No data in option chain")
-            return live_data
-        
-        # Helper function to find LTP for a given strike and option type
-        def get_ltp(strike, option_type):
-            """
-            Extract LTP from option chain data.
-            Each record contains 'strikePrice', 'CE', and 'PE' keys.
-            """
-            for record in data_list:
-                if record.get('strikePrice') == strike:
-                    option_data = record.get(option_type, {})
-                    if option_data and isinstance(option_data, dict):
-                        ltp = option_data.get('lastPrice')
-                        if ltp is not None:
-                            return float(ltp)
-            return None
+        live_data['spot'] = spot_future.result(timeout=NSE_FETCH_TIMEOUT_SECONDS)
+        if ltps_future is not None:
+            ltps = ltps_future.result(timeout=NSE_FETCH_TIMEOUT_SECONDS)
+            live_data.update(ltps)
 
-        # Fetch LTPs for all instruments
-        live_data['sell_ce_ltp'] = get_ltp(instruments['SELL_CE_STRIKE'], 'CE')
-        live_data['buy_ce_ltp'] = get_ltp(instruments['BUY_CE_STRIKE'], 'CE')
-        live_data['sell_pe_ltp'] = get_ltp(instruments['SELL_PE_STRIKE'], 'PE')
-        live_data['buy_pe_ltp'] = get_ltp(instruments['BUY_PE_STRIKE'], 'PE')
-        
-        # Log which prices were found
-        print(f"Fetched prices - SELL_CE: {live_data['sell_ce_ltp']}, "
-              f"BUY_CE: {live_data['buy_ce_ltp']}, "
-              f"SELL_PE: {live_data['sell_pe_ltp']}, "
-              f"BUY_PE: {live_data['buy_pe_ltp']}")
-
-    except (requests.exceptions.RequestException, json.JSONDecodeError, KeyError, IndexError, TypeError) as e:
-        print(f"API ERROR: {e} at {live_data['timestamp']}. Returning partial/None data.")
-        import traceback
-        traceback.print_exc()
-    
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError, FutureTimeoutError,
+            KeyError, IndexError, TypeError) as e:
+        logger.warning("NSE fetch failed at %s: %s", live_data['timestamp'], e,
+                       exc_info=True, extra={'rate_key': 'nse_fetch'})
+        return None
+
+    if live_data['spot'] is None:
+        return None
+    if include_options and len(ltps) < len(OPTION_LEGS):
+        return None
     return live_data
 
+def compute_poll_interval(now_seconds: int, trade_active: bool, consecutive_api_errors: int) -> int:
+    """Seconds to wait before the next poll, keyed to where we are in the session."""
+    if consecutive_api_errors:
+        return min(POLLING_INTERVAL_SECONDS * 2 ** (consecutive_api_errors - 1), MAX_BACKOFF_SECONDS)
+
+    if trade_active:
+        # Tighten up as the end-of-day exit approaches
+        if MARKET_CLOSE_SECONDS - now_seconds <= FAST_POLL_WINDOW_SECONDS:
+            return FAST_POLL_SECONDS
+        return POLLING_INTERVAL_SECONDS
+
+    seconds_to_entry = ENTRY_TIME_START_SECONDS - now_seconds
+    if abs(seconds_to_entry) <= FAST_POLL_WINDOW_SECONDS:
+        return FAST_POLL_SECONDS
+    if seconds_to_entry > 0:
+        # Poll slowly, but never sleep through the start of the fast window
+        return max(FAST_POLL_SECONDS, min(PRE_ENTRY_POLL_SECONDS, seconds_to_entry - FAST_POLL_WINDOW_SECONDS))
+    return POLLING_INTERVAL_SECONDS
+
 # --- Scheduled Tasks ---
 def morning_status_update():
     """Send a morning status update at 9:30 AM IST."""
     now_ist = datetime.now(INDIA_TZ)
-    message = (
-        f"☀️ *Good Morning!* (IST: {now_ist.strftime('%H:%M:%S')})\n"
-        f"Bot Status: `{bot_state['status_message']}`\n"
-        f"Awaiting market open and entry conditions."
-    )
-    send_telegram_message(message)
+    send_telegram_message(MORNING_MSG_TMPL.format_map({
+        'time': now_ist.strftime('%H:%M:%S'),
+        'status': bot_state['status_message'],
+    }))
 
 # --- Web Server Endpoints ---
 @app.route('/health')
@@ -185,189 +499,248 @@ def health_check():
 @app.route('/')
 def status_page():
     """Simple status page to view bot state."""
+    snapshot = bot_state_snapshot
     return jsonify({
-        "status": bot_state["status_message"],
-        "trade_active": bot_state["trade_active"],
-        "pnl_per_lot": bot_state["pnl_per_lot"],
-        "position_book": bot_state["position_book"],
+        "status": snapshot.status_message,
+        "trade_active": snapshot.trade_active,
+        "pnl_per_lot": snapshot.pnl_per_lot,
+        "position_book": snapshot.position_book,
         "server_time": datetime.now().isoformat()
     })
 
 # --- Trading Bot Logic ---
-def run_trading_bot():
-    """Main function for the trading bot, designed to be run in a thread."""
-    global trade_log, bot_state
+TRADING_JOB_ID = 'trading_tick'
+
+# Process-wide NSE client. It is created and warmed on nse_pool at startup,
+# so the cookie handshake runs off the web-serving path, and
+# start_trading_session waits on the future
+NSE_CLIENT_INIT_TIMEOUT_SECONDS = 30
+nse_client_future = None
+# IST date the current client was warmed; NSE cookies do not outlive the day
+nse_client_warmed_on = None
+
+def warm_nse_client():
+    """Start creating and warming a new NSE client on nse_pool."""
+    global nse_client_future, nse_client_warmed_on
+    nse_client_warmed_on = datetime.now(INDIA_TZ).date()
+    nse_client_future = nse_pool.submit(create_nse_client)
+
+def create_nse_client() -> NSELive:
+    """Create an NSE client and prime its cookies with one index quote."""
+    n = FastNSELive()
+    n.live_index("NIFTY 50")
+    return n
+
+def start_trading_session():
+    """
+    Initialize the NSE client, restore any saved position and schedule the
+    polling job for today's session. Runs on the scheduler at startup and at
+    every weekday market open.
+    """
+    if scheduler.get_job(TRADING_JOB_ID):
+        print("Trading session already running.")
+        return
 
     # --- 1. Initialization & State Restoration ---
+    global nse_client_future
+    # Reuse a client warmed earlier today (e.g. at a pre-market deploy);
+    # start a new one if there is none or it was warmed on an earlier day
+    if nse_client_future is None or nse_client_warmed_on != datetime.now(INDIA_TZ).date():
+        warm_nse_client()
     try:
-        n = NSELive()
+        n = nse_client_future.result(timeout=NSE_CLIENT_INIT_TIMEOUT_SECONDS)
         print("NSELive initialized successfully")
     except Exception as e:
+        # Failed or timed out: the next session starts a fresh warm-up. NSE
+        # requests are timed out, so an abandoned one frees its worker soon.
+        nse_client_future = None
         print(f"Failed to initialize NSELive: {e}. Exiting.")
         send_telegram_message(f"CRITICAL: Failed to initialize NSELive API: {e} 🛑")
         bot_state["status_message"] = f"CRITICAL ERROR: {e}"
+        publish_state_snapshot()
         return
 
-    if os.path.exists(STATE_FILE):
+    try:
+        with open(STATE_FILE, 'rb') as f:
+            saved_state = f.read()
+    except FileNotFoundError:
+        saved_state = None
+
+    if saved_state is not None:
         print("Found existing state file. Loading previous trade state.")
         send_telegram_message("🔄 Bot restarted. Loading existing trade state...")
-        with open(STATE_FILE, 'r') as f:
-            state = json.load(f)
-            bot_state['trade_active'] = state.get('trade_active', False)
-            bot_state['position_book'] = state.get('position_book', {})
+        state = orjson.loads(saved_state)
+        bot_state['trade_active'] = state.get('trade_active', False)
+        bot_state['position_book'] = state.get('position_book', {})
         if not bot_state['trade_active'] or not bot_state['position_book']:
             print("State file was invalid. Starting fresh.")
             bot_state['trade_active'] = False
             bot_state['position_book'] = {}
     
     if not bot_state['trade_active']:
-        print(f"--- Paper Trading Bot Initialized (Strategy: {PRIMARY_STRATEGY}) ---")
-    
-    # --- 2. Main Trading Loop ---
-    try:
-        while True:
-            current_time = datetime.now().time()
-            
-            if not (MARKET_OPEN_TIME <= current_time <= MARKET_CLOSE_TIME):
-                bot_state["status_message"] = "Market is closed."
-                print(bot_state["status_message"])
-                if bot_state['trade_active']:
-                    exit_message = (
-                        f"🛑 *--- TRADE EXITED (Market Closed) ---*\n"
-                        f"Final P&L: *₹{bot_state['pnl_per_lot']:.2f}*"
-                    )
-                    send_telegram_message(exit_message)
-                    if os.path.exists(STATE_FILE):
-                        os.remove(STATE_FILE)
-                    bot_state['trade_active'] = False
-                    bot_state['position_book'] = {}
-                
-                print("Trading loop finished for the day.")
-                break
-                
-            live_data = fetch_live_data(n, INSTRUMENTS)
-            
-            # Check if we have valid data
-            if any(v is None for v in live_data.values()):
-                bot_state["status_message"] = "API Error or Missing Data. Skipping iteration."
-                print(f"{live_data['timestamp']} - {bot_state['status_message']}")
-                time.sleep(POLLING_INTERVAL_SECONDS)
-                continue
+        print(f"--- Paper Trading Bot Initialized (Strategy: {CFG.primary_strategy}) ---")
+    publish_state_snapshot()
 
-            # --- Entry Logic ---
-            if not bot_state['trade_active']:
-                spot = live_data['spot']
-                bot_state["status_message"] = f"Waiting for entry. Spot: {spot:.2f}"
-                
-                if current_time < ENTRY_TIME_START:
-                    print(f"Status: {current_time} | Waiting for {ENTRY_TIME_START}. Spot: {spot}")
-                    time.sleep(POLLING_INTERVAL_SECONDS)
-                    continue
-                
-                if (ENTRY_CONDITIONS['MIN_SPOT'] <= spot <= ENTRY_CONDITIONS['MAX_SPOT']):
-                    bot_state['trade_active'] = True
-                    bot_state['position_book'] = {
-                        'SELL_CE': live_data['sell_ce_ltp'],
-                        'BUY_CE': live_data['buy_ce_ltp'],
-                        'SELL_PE': live_data['sell_pe_ltp'],
-                        'BUY_PE': live_data['buy_pe_ltp']
-                    }
-                    
-                    # Save state to file
-                    with open(STATE_FILE, 'w') as f:
-                        json.dump({
-                            'trade_active': True,
-                            'position_book': bot_state['position_book']
-                        }, f)
-                    
-                    entry_message = (
-                        f"🚀 *--- TRADE ENTERED ---*\n"
-                        f"Strategy: {PRIMARY_STRATEGY}\n"
-                        f"Spot Price: *{spot:.2f}*\n"
-                        f"SELL CE {INSTRUMENTS['SELL_CE_STRIKE']}: {live_data['sell_ce_ltp']}\n"
-                        f"BUY CE {INSTRUMENTS['BUY_CE_STRIKE']}: {live_data['buy_ce_ltp']}\n"
-                        f"SELL PE {INSTRUMENTS['SELL_PE_STRIKE']}: {live_data['sell_pe_ltp']}\n"
-                        f"BUY PE {INSTRUMENTS['BUY_PE_STRIKE']}: {live_data['buy_pe_ltp']}"
-                    )
-                    send_telegram_message(entry_message)
-                    log_trade(live_data['timestamp'], 'ENTRY', PRIMARY_STRATEGY, spot, 0, 'Trade entered')
-
-            # --- Monitoring & Exit Logic ---
-            if bot_state['trade_active']:
-                # Calculate P&L
-                entry_book = bot_state['position_book']
-                pnl_per_lot = (
-                    (entry_book['SELL_CE'] - live_data['sell_ce_ltp']) +
-                    (live_data['buy_ce_ltp'] - entry_book['BUY_CE']) +
-                    (entry_book['SELL_PE'] - live_data['sell_pe_ltp']) +
-                    (live_data['buy_pe_ltp'] - entry_book['BUY_PE'])
-                ) * LOT_SIZE
-                
-                bot_state["pnl_per_lot"] = pnl_per_lot
-                bot_state["status_message"] = f"Position active. P&L: {pnl_per_lot:.2f}"
-                print(f"{live_data['timestamp']} - {bot_state['status_message']}")
-                
-                exit_reason = None
-                if pnl_per_lot >= PROFIT_TARGET_PER_LOT:
-                    exit_reason = "PROFIT_TARGET"
-                elif not (STOP_LOSS_RANGE['MIN'] <= live_data['spot'] <= STOP_LOSS_RANGE['MAX']):
-                    exit_reason = f"STOP_LOSS (Spot {live_data['spot']} breached range)"
-                elif current_time >= MARKET_CLOSE_TIME:
-                    exit_reason = "END_OF_DAY"
-                    
-                if exit_reason:
-                    exit_message = (
-                        f"🛑 *--- TRADE EXITED ---*\n"
-                        f"Reason: {exit_reason}\n"
-                        f"Final P&L: *₹{pnl_per_lot:.2f}*"
-                    )
-                    send_telegram_message(exit_message)
-                    log_trade(live_data['timestamp'], 'EXIT', PRIMARY_STRATEGY, 
-                             live_data['spot'], pnl_per_lot, exit_reason)
-                    
-                    if os.path.exists(STATE_FILE):
-                        os.remove(STATE_FILE)
-                    
-                    bot_state['trade_active'] = False
-                    bot_state['position_book'] = {}
-                    bot_state['pnl_per_lot'] = 0.0
-                    break
-            
-            time.sleep(POLLING_INTERVAL_SECONDS)
+    tick_state = {
+        # Entry prices in SELL_CE, BUY_CE, SELL_PE, BUY_PE order, unpacked from the book once per position
+        'entry_prices': None,
+        'consecutive_api_errors': 0,
+        'interval': POLLING_INTERVAL_SECONDS,
+    }
 
-    except KeyboardInterrupt:
-        bot_state["status_message"] = "Manual override detected. Shutting down."
-        print(bot_state["status_message"])
-        send_telegram_message("Manual override detected. 🛑 Shutting down.")
+    # --- 2. Schedule the polling job ---
+    # max_instances=1 and coalesce=True keep a slow NSE fetch from stacking up
+    # overlapping or back-to-back catch-up runs.
+    scheduler.add_job(
+        run_trading_tick, 'interval', seconds=POLLING_INTERVAL_SECONDS,
+        args=(n, tick_state), id=TRADING_JOB_ID, next_run_time=datetime.now(INDIA_TZ),
+        max_instances=1, coalesce=True
+    )
+
+def end_trading_session():
+    """Stop the polling job and save the trade log."""
+    if scheduler.get_job(TRADING_JOB_ID):
+        scheduler.remove_job(TRADING_JOB_ID)
+    if trade_log_rows:
+        pd.DataFrame(trade_log_rows, columns=trade_log_cols).to_csv(LOG_FILE_NAME, index=False)
+        print(f"Trade log saved to {LOG_FILE_NAME}")
+    print("Trading session finished.")
+
+def run_trading_tick(n: NSELive, tick_state: dict):
+    """Scheduler job: run one polling iteration, then reschedule or end the session."""
+    try:
+        interval = trading_tick(n, tick_state)
     except Exception as e:
         bot_state["status_message"] = f"CRITICAL ERROR: {e}"
-        print(f"--- {bot_state['status_message']} ---")
-        import traceback
-        traceback.print_exc()
+        logger.error("Trading tick failed: %s", e, exc_info=True, extra={'rate_key': 'trading_tick'})
         send_telegram_message(f"CRITICAL ERROR: {e} 🛑 Shutting down.")
+        interval = None
+    publish_state_snapshot()
+
+    if interval is None:
+        end_trading_session()
+    elif interval != tick_state['interval']:
+        tick_state['interval'] = interval
+        scheduler.reschedule_job(TRADING_JOB_ID, trigger='interval', seconds=interval)
+
+def trading_tick(n: NSELive, tick_state: dict):
+    """
+    One iteration of the trading loop. Returns the number of seconds until the
+    next poll, or None once the session is over for the day.
+    """
+    # Read the clock once per iteration, in exchange time regardless of the
+    # host's timezone, and compare as seconds-of-day integers
+    now = datetime.now(INDIA_TZ)
+    now_seconds = now.hour * 3600 + now.minute * 60 + now.second
     
-    finally:
-        if not trade_log.empty:
-            trade_log.to_csv(LOG_FILE_NAME, index=False)
-            print(f"Trade log saved to {LOG_FILE_NAME}")
-        print("Trading bot thread finished.")
+    if not (MARKET_OPEN_SECONDS <= now_seconds <= MARKET_CLOSE_SECONDS):
+        bot_state["status_message"] = "Market is closed."
+        print(bot_state["status_message"])
+        if bot_state['trade_active']:
+            send_telegram_message(MARKET_CLOSED_EXIT_MSG_TMPL.format_map({'pnl': bot_state['pnl_per_lot']}))
+            clear_state_file()
+            bot_state['trade_active'] = False
+            bot_state['position_book'] = {}
+        
+        print("Trading loop finished for the day.")
+        return None
+        
+    # Before the entry window with no open position only the spot is
+    # needed, so skip downloading the option chain
+    need_options = bot_state['trade_active'] or now_seconds >= ENTRY_TIME_START_SECONDS
+    live_data = fetch_live_data(n, now, include_options=need_options)
+    
+    # Check if we have valid data
+    if live_data is None:
+        bot_state["status_message"] = "API Error or Missing Data. Skipping iteration."
+        print(f"{now} - {bot_state['status_message']}")
+        tick_state['consecutive_api_errors'] += 1
+        return compute_poll_interval(now_seconds, bot_state['trade_active'], tick_state['consecutive_api_errors'])
+    tick_state['consecutive_api_errors'] = 0
+
+    # --- Entry Logic ---
+    if not bot_state['trade_active']:
+        spot = live_data['spot']
+        bot_state["status_message"] = f"Waiting for entry. Spot: {spot:.2f}"
+        
+        if now_seconds < ENTRY_TIME_START_SECONDS:
+            print(f"Status: {now.time()} | Waiting for {ENTRY_TIME_START}. Spot: {spot}")
+            return compute_poll_interval(now_seconds, False, 0)
+        
+        if (CFG.min_spot <= spot <= CFG.max_spot):
+            bot_state['trade_active'] = True
+            bot_state['position_book'] = {
+                'SELL_CE': live_data['sell_ce_ltp'],
+                'BUY_CE': live_data['buy_ce_ltp'],
+                'SELL_PE': live_data['sell_pe_ltp'],
+                'BUY_PE': live_data['buy_pe_ltp']
+            }
+            
+            # Save state to file
+            save_state({
+                'trade_active': True,
+                'position_book': bot_state['position_book']
+            })
+            
+            send_telegram_message(ENTRY_MSG_TMPL.format_map({
+                **live_data, **ENTRY_MSG_STRIKES, 'strategy': CFG.primary_strategy,
+            }))
+            log_trade(live_data['timestamp'], 'ENTRY', CFG.primary_strategy, spot, 0, 'Trade entered')
+
+    # --- Monitoring & Exit Logic ---
+    if bot_state['trade_active']:
+        # Calculate P&L
+        entry_book = bot_state['position_book']
+        if tick_state['entry_prices'] is None:
+            tick_state['entry_prices'] = tuple(entry_book[leg] for leg in POSITION_LEGS)
+        e_sce, e_bce, e_spe, e_bpe = tick_state['entry_prices']
+        sce, bce, spe, bpe = (live_data['sell_ce_ltp'], live_data['buy_ce_ltp'],
+                              live_data['sell_pe_ltp'], live_data['buy_pe_ltp'])
+        pnl_per_lot = ((e_sce - sce) + (bce - e_bce) + (e_spe - spe) + (bpe - e_bpe)) * CFG.lot_size
+        
+        bot_state["pnl_per_lot"] = pnl_per_lot
+        bot_state["status_message"] = f"Position active. P&L: {pnl_per_lot:.2f}"
+        print(f"{live_data['timestamp']} - {bot_state['status_message']}")
+        
+        exit_reason = None
+        if pnl_per_lot >= CFG.profit_target:
+            exit_reason = "PROFIT_TARGET"
+        elif not (CFG.sl_min <= live_data['spot'] <= CFG.sl_max):
+            exit_reason = f"STOP_LOSS (Spot {live_data['spot']} breached range)"
+        elif now_seconds >= MARKET_CLOSE_SECONDS:
+            exit_reason = "END_OF_DAY"
+            
+        if exit_reason:
+            send_telegram_message(EXIT_MSG_TMPL.format_map({'reason': exit_reason, 'pnl': pnl_per_lot}))
+            log_trade(live_data['timestamp'], 'EXIT', CFG.primary_strategy, 
+                     live_data['spot'], pnl_per_lot, exit_reason)
+            
+            clear_state_file()
+            
+            bot_state['trade_active'] = False
+            bot_state['position_book'] = {}
+            bot_state['pnl_per_lot'] = 0.0
+            tick_state['entry_prices'] = None
+            return None
+    
+    return compute_poll_interval(now_seconds, bot_state['trade_active'], 0)
 
 # --- Gunicorn Application Startup ---
-send_telegram_message(
-    f"✅ *Deployment Successful & Bot Initialized*\n"
-    f"Strategy: {PRIMARY_STRATEGY}\n"
-    f"Watching NIFTY 50."
-)
+send_telegram_message(DEPLOYMENT_MSG_TMPL.format_map({'strategy': CFG.primary_strategy}))
 
-# Initialize and start the scheduler
+# Warm the NSE client in the background; start_trading_session waits on it
+warm_nse_client()
+
+# Initialize and start the scheduler. The trading session starts right away
+# and again at every weekday market open; the polling job ends itself at close.
 scheduler = BackgroundScheduler(timezone=INDIA_TZ)
 scheduler.add_job(morning_status_update, 'cron', hour=9, minute=30)
+scheduler.add_job(start_trading_session, 'cron', day_of_week='mon-fri',
+                  hour=MARKET_OPEN_TIME.hour, minute=MARKET_OPEN_TIME.minute,
+                  second=MARKET_OPEN_TIME.second)
+scheduler.add_job(start_trading_session)
 scheduler.start()
 
-# Start the main trading bot logic in a background thread
-bot_thread = Thread(target=run_trading_bot, daemon=True)
-bot_thread.start()
-
 # --- Main Execution Block (for local development) ---
 if __name__ == "__main__":
     port = int(os.getenv('PORT', 10000))